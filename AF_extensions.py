@@ -10,121 +10,274 @@ Authors: Latif YAYA, Nassim LATTAB, Kentaro SAUCE
 Creation Date: 25/12/2023
 """
 
-import AF_util
+import os, AF_util
+from contextlib import closing # Used to stop the enumeration of the extensions once a query is decided @see is_accepted().
+from functools import partial # Used to pass the framework to the worker processes @see search_extensions().
+from multiprocessing import Event, Pool # Used to split the enumeration of large frameworks across the CPU cores.
 
-def is_conflict_free(arg_framework: dict, arg_set: set) -> bool:
+# Below this number of undecided arguments in the largest strongly connected component, the search is too short to pay for starting
+# worker processes (which takes up to a second where they are spawned instead of forked, e.g. on Windows and macOS).
+PARALLEL_MIN_ARGUMENTS = 20
+# The search is split on the choices made for the arguments of id lower than PARALLEL_SPLIT_DEPTH.
+PARALLEL_SPLIT_DEPTH = 8
+
+# Event set once the search of the worker processes can stop, shared with them when the pool starts @see init_worker().
+STOP_SEARCH = None
+# Number of sets checked by a worker process between two checks of the event.
+STOP_CHECK_INTERVAL = 1024
+
+# Memoized extensions of the frameworks. Key : bitmask representation of the framework, Value : {semantics: masks of the extensions}.
+EXTENSIONS_CACHE = {}
+# Memoized decisions of the queries. Key : (bitmask representation of the framework, semantics, argument bit, skeptical), Value : decision.
+DECISIONS_CACHE = {}
+# Extensions found by the searches of the queries. Key : bitmask representation of the framework, Value : {semantics: masks of the extensions}.
+FOUND_EXTENSIONS = {}
+
+def is_conflict_free(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
-    Checks if the provided argument set is conflict-free in the argumentation framework (AF), or not.
+    Checks if the provided argument set (mask) is conflict-free in the argumentation framework (AF), or not.
     """
     # Return False if any argument from the set attacks another one from the set, and True otherwise
-    for current_arg in arg_set:
-        for attacked_arg in arg_framework[current_arg]:
-            if attacked_arg in arg_set: return False
-    return True
-
-def is_admissible(arg_framework: dict, arg_set: set) -> bool:
-    """ 
-    Checks if the provided set is admissible, or not. 
-    """
-    # The empty set is always an admissible set, although never used since we cannot provide empty sets as a program argument.
-    if len(arg_set) == 0: return True
-    
+    return not AF_util.attacked_by(arg_framework.attacks, arg_mask) & arg_mask
+
+def is_admissible(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
+    """
+    Checks if the provided set (mask) is admissible, or not.
+    """
+    # The empty set is always an admissible set.
+    if not arg_mask: return True
+
     # The set has to be conflict-free to be admissible.
-    if not is_conflict_free(arg_framework, arg_set): return False
-    
-    # If attacked, each argument of the set must be defended by another (from the set) for the set to be admissible.
-    return all(AF_util.is_defended(arg_framework, arg_set, argument) for argument in arg_set)
+    if not is_conflict_free(arg_framework, arg_mask): return False
+
+    # If attacked, each argument of the set must be defended by the set, i.e. each of its attackers must be attacked by the set.
+    attacked_mask = AF_util.attacked_by(arg_framework.attacks, arg_mask)
+    return AF_util.defended_by(arg_framework.attackers, attacked_mask) & arg_mask == arg_mask
+
+def find_all_sigma_extensions(arg_framework: AF_util.BitmaskAF, semantics: str) -> set:
+    """
+    Returns the set of all σ extensions of the argumentation framework, as tuples of the names of their arguments.
+    """
+    return {AF_util.mask_to_arguments(arg_framework, arg_mask) for arg_mask in sigma_extension_masks(arg_framework, semantics)}
+
+
+def sigma_extension_masks(bitmask_af: AF_util.BitmaskAF, semantics: str) -> frozenset:
+    """
+    Returns the masks of all σ extensions of the framework given by its bitmask representation.
+    The result is memoized, so that several queries on the same framework only enumerate its extensions once.
+    """
+    extensions = EXTENSIONS_CACHE.setdefault(bitmask_af, {})
+    if semantics not in extensions:
+        # Searching the complete extensions also gives the stable ones, while the stable extensions alone are found by a narrower search.
+        found = list(search_extensions(bitmask_af, semantics))
+        if semantics == "COMPLETE": extensions["COMPLETE"] = frozenset(arg_mask for arg_mask, _ in found)
+        extensions["STABLE"] = frozenset(arg_mask for arg_mask, is_stable in found if is_stable)
+    return extensions[semantics]
+
+
+def search_extensions(bitmask_af: AF_util.BitmaskAF, semantics: str, required_mask: int = 0, excluded_mask: int = 0, first_only: bool = False):
+    """
+    Yields the σ extensions of the framework given by its bitmask representation as tuples (mask, is_stable), as soon as they are found.
+    If semantics is "STABLE", only the stable extensions are searched, otherwise every complete extension is yielded.
+    Only the extensions containing every argument of required_mask and none of excluded_mask are searched.
+    If first_only is True, only the first extension is used, and the worker processes stop as soon as one of them finds it.
+    """
+    # Every complete extension, and thus every stable extension, contains the grounded extension which is computed in polynomial time.
+    # The search is then restricted to the conflict-free sets containing it, which also excludes the arguments it attacks or is attacked by.
+    attacks, attackers, components = bitmask_af.attacks, bitmask_af.attackers, bitmask_af.components
+    seed_mask = AF_util.grounded_extension(attacks, attackers) | required_mask
+    if AF_util.attacked_by(attacks, seed_mask) & seed_mask or seed_mask & excluded_mask: return
+    stable_only = semantics == "STABLE"
+
+    # The search is exponential in the number of undecided arguments of the largest component, i.e. those which are neither in the seed,
+    # nor attacked by it, nor excluded, which is usually far less than the number of arguments.
+    undecided_mask = bitmask_af.all_mask & ~(seed_mask | AF_util.attacked_by(attacks, seed_mask) | excluded_mask)
+    search_size = max(((undecided_mask & ((1 << hi) - (1 << lo))).bit_count() for lo, hi in components), default=0)
+    if search_size < PARALLEL_MIN_ARGUMENTS or os.cpu_count() == 1:
+        yield from find_extension_masks(attacks, attackers, components, stable_only, seed_mask, 0, excluded_mask)
+        return
+
+    # Every conflict-free set is the extension of exactly one conflict-free set of the first PARALLEL_SPLIT_DEPTH arguments (its seed),
+    # with arguments of higher id. The seeds are thus independent parts of the search which are dispatched to the worker processes.
+    split_depth = min(PARALLEL_SPLIT_DEPTH, len(attacks))
+    seeds = (split_mask for split_mask, _ in AF_util.enumerate_conflict_free(attacks, attackers, split_depth, seed_mask, excluded_mask=excluded_mask))
+    stop_search = Event()
+    pool = Pool(initializer=init_worker, initargs=(stop_search,))
+    try:
+        find_extensions_from = partial(find_extension_list, attacks, attackers, components, stable_only, start=split_depth,
+                                      excluded_mask=excluded_mask, first_only=first_only)
+        for extensions in pool.imap_unordered(find_extensions_from, seeds):
+            yield from extensions
+    finally:
+        # Once the enumeration is closed (e.g. a query is decided), the workers stop their search and skip the seeds left instead of being
+        # terminated, as a worker terminated while sending its results would keep the lock of the result queue and block the pool.
+        stop_search.set()
+        pool.close()
+        pool.join()
+
 
-def find_all_sigma_extensions(arg_framework: dict, semantics: str) -> set:
+def init_worker(stop_search):
     """
-    Returns the set of all σ extensions of the argumentation framework.
+    Initializes a worker process of the pool with the event telling it to stop the search @see search_extensions().
     """
-    all_sigma_extensions = set()
-    
-    # Iterate over every possible combination of arguments in the framework,
-    # and add it to the all_sigma_extensions set if it is an extension with respect to the semantics σ.
-    all_arguments = list(arg_framework.keys())
+    global STOP_SEARCH
+    STOP_SEARCH = stop_search
+
+
+def find_extension_masks(attacks: tuple, attackers: tuple, components: tuple, stable_only: bool, seed_mask: int, start: int, excluded_mask: int = 0):
+    """
+    Yields the extensions as tuples (mask, is_stable) among the conflict-free sets made of the given seed mask
+    and of arguments of id greater or equal to start, which are not part of excluded_mask.
+    If stable_only is True, only the stable extensions are searched, otherwise every complete extension is yielded.
+    """
+    all_mask = (1 << len(attacks)) - 1
+
+    # Whether an argument belongs to an extension only depends on its attackers, which belong to its own strongly connected component
+    # or to the previous ones @see AF_util.build_bitmasks(). The extensions are thus built one component at a time, in topological order,
+    # and the choices made for a component are checked before going on with the next one. The search is exponential
+    # in the size of the largest component, instead of the number of arguments.
+    stack = [(0, seed_mask, AF_util.attacked_by(attacks, seed_mask))]
+    stop_search, checked = STOP_SEARCH, 0
+    while stack:
+        k, arg_mask, attacked = stack.pop()
+        if k == len(components):
+            yield arg_mask, arg_mask | attacked == all_mask
+            continue
+
+        lo, hi = components[k]
+        component_mask, upstream_mask = (1 << hi) - (1 << lo), (1 << lo) - 1
+        component_attackers = attackers[lo:hi]
+
+        # An argument attacked by an argument of a previous component which is neither in the set nor attacked by it can never be defended.
+        undefended_mask = excluded_mask
+        for j in AF_util.iter_bits(component_mask & ~arg_mask):
+            if attackers[j] & upstream_mask & ~attacked:
+                undefended_mask |= 1 << j
+
+        # Iterate over the conflict-free extensions of the set with arguments of the component (the stable extensions alone are searched among
+        # the sets which can still attack every argument of the component outside of them), and keep those in which the arguments
+        # of the component in the set are exactly those it defends, and which also attack every other argument of the component if stable.
+        for extended_mask, extended_attacked in AF_util.enumerate_conflict_free(attacks, attackers, hi, arg_mask, max(lo, start),
+                                                                                covering=stable_only, excluded_mask=undefended_mask):
+            # In a worker process, the search ends as soon as it was stopped @see search_extensions().
+            if stop_search is not None:
+                checked += 1
+                if not checked % STOP_CHECK_INTERVAL and stop_search.is_set(): return
+
+            # Most sets are rejected at once as their last added argument (of highest id) is not defended,
+            # before computing the mask of all the arguments of the component they defend.
+            last = (extended_mask & component_mask).bit_length() - 1
+            if last >= lo and attackers[last] & ~extended_attacked: continue
+            if AF_util.defended_by(component_attackers, extended_attacked) << lo != extended_mask & component_mask: continue
+            if stable_only and (extended_mask | extended_attacked) & component_mask != component_mask: continue
+            stack.append((k + 1, extended_mask, extended_attacked))
+
+
+def find_extension_list(attacks: tuple, attackers: tuple, components: tuple, stable_only: bool, seed_mask: int, start: int, excluded_mask: int = 0,
+                        first_only: bool = False) -> list:
+    """
+    Returns the list of the extensions yielded by find_extension_masks(), for the worker processes to send them back at once.
+    The seed is skipped if the search was stopped meanwhile. If first_only is True, only the first extension is returned,
+    and the other worker processes are told to stop their search.
+    """
+    if STOP_SEARCH is not None and STOP_SEARCH.is_set(): return []
+    extensions = find_extension_masks(attacks, attackers, components, stable_only, seed_mask, start, excluded_mask)
+    if not first_only: return list(extensions)
+
+    extension = next(extensions, None)
+    if extension is None: return []
+    if STOP_SEARCH is not None: STOP_SEARCH.set()
+    return [extension]
+
+
+def is_accepted(arg_framework: AF_util.BitmaskAF, argument_bit: int, semantics: str, skeptical: bool) -> bool:
+    """
+    Decide the Credulous (or Skeptical) acceptability of the given argument (bit) with respect to the semantics σ.
+    """
+    # The grounded extension is the least complete extension: it is exactly the intersection of all of them, and no argument
+    # it attacks belongs to any complete (or stable) extension. Most complete queries are thus answered without any enumeration.
+    grounded_mask = AF_util.grounded_extension(arg_framework.attacks, arg_framework.attackers)
+    if skeptical and grounded_mask & argument_bit: return True
     if semantics == "COMPLETE":
-        for arg_set in AF_util.powerset(all_arguments): # powerset() returns every combination of the provided arguments as a set of sorted tuples.
-            if verify_complete_extension(arg_framework, arg_set):
-                all_sigma_extensions.add(arg_set)
-    elif semantics == "STABLE":
-        for arg_set in AF_util.powerset(all_arguments):
-            if verify_stable_extension(arg_framework, arg_set):
-                all_sigma_extensions.add(arg_set)
+        if skeptical or grounded_mask & argument_bit: return bool(grounded_mask & argument_bit)
+        if AF_util.attacked_by(arg_framework.attacks, grounded_mask) & argument_bit: return False
+
+    # Answer from the memoized extensions of the framework if they were already enumerated @see sigma_extension_masks().
+    extensions = EXTENSIONS_CACHE.get(arg_framework, {}).get(semantics)
+    if extensions is not None:
+        if skeptical:
+            return all(arg_mask & argument_bit for arg_mask in extensions)
+        return any(arg_mask & argument_bit for arg_mask in extensions)
+
+    # Answer from the decision of a previous query, or from an extension found by one of them: an extension containing the argument
+    # accepts it credulously, and an extension which does not contain it rejects it skeptically.
+    query = (arg_framework, semantics, argument_bit, skeptical)
+    if query in DECISIONS_CACHE: return DECISIONS_CACHE[query]
+    found_extensions = FOUND_EXTENSIONS.setdefault(arg_framework, {})
+    if any(bool(arg_mask & argument_bit) != skeptical for arg_mask in found_extensions.get(semantics, ())): return not skeptical
+
+    # Otherwise, only search for the extensions which contain the argument (credulous) or which do not (skeptical), and stop at the first one found.
+    # The search is closed right away, which tells the worker processes still searching to stop @see search_extensions().
+    required_mask, excluded_mask = (0, argument_bit) if skeptical else (argument_bit, 0)
+    with closing(search_extensions(arg_framework, semantics, required_mask, excluded_mask, first_only=True)) as extensions:
+        found = next(extensions, None)
 
-    return all_sigma_extensions
+    # The extension found is kept for the next queries (a stable extension found by a complete search is kept for both semantics).
+    if found is not None:
+        arg_mask, is_stable = found
+        found_extensions.setdefault(semantics, set()).add(arg_mask)
+        if is_stable: found_extensions.setdefault("STABLE", set()).add(arg_mask)
+    DECISIONS_CACHE[query] = accepted = found is None if skeptical else found is not None
+    return accepted
 
 
-def verify_complete_extension(arg_framework: dict, arg_set: set) -> bool:
+def verify_complete_extension(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
-    Determine whether the provided argument set is a complete extension of the argumentation framework, or not.
+    Determine whether the provided argument set (mask) is a complete extension of the argumentation framework, or not.
     """
-    # The set has to be admissible to be a complete extension.
-    if not is_admissible(arg_framework, arg_set): return False 
-    
-    # Create a set of all arguments of the framework that are not in the provided argument set.
-    other_args = {argument for argument in arg_framework.keys() if argument not in arg_set}
+    # The set has to be conflict-free to be a complete extension.
+    if not is_conflict_free(arg_framework, arg_mask): return False
+    attacked_mask = AF_util.attacked_by(arg_framework.attacks, arg_mask)
 
-    # Return False if at least one argument that isn't in the provided set is defended by an argument of the set, and True otherwise.
-    return not any(AF_util.is_defended(arg_framework, arg_set, other_arg) for other_arg in other_args)
+    # A conflict-free set is a complete extension if and only if the arguments it defends are exactly its own arguments
+    # (each of them is defended, i.e. it is admissible, and no other argument is), which is checked by a single comparison.
+    return AF_util.defended_by(arg_framework.attackers, attacked_mask) == arg_mask
 
 
-def verify_stable_extension(arg_framework: dict, arg_set: set) -> bool:
+def verify_stable_extension(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
-    Determine whether the provided argument set is a stable extension of the argumentation framework, or not.
+    Determine whether the provided argument set (mask) is a stable extension of the argumentation framework, or not.
     """
     # The set has to be conflict-free to be a stable extension.
-    if not is_conflict_free(arg_framework, arg_set): return False
-        
-    # Create a set of all arguments of the framework that are not in the provided argument set.
-    other_args = {argument for argument in arg_framework.keys() if argument not in arg_set}
+    if not is_conflict_free(arg_framework, arg_mask): return False
 
     # The argument set is a stable extension if all other arguments of the framework are attacked by the provided arguments.
-    # Then it is not stable if at least one of the other arguments is never attacked.
-    never_attacked = True
-    for other_arg in other_args:
-        for arg in arg_set:
-            if other_arg in arg_framework[arg]:
-                never_attacked = False
-        if never_attacked:
-            return False
-        never_attacked = True
-    return True
+    return AF_util.attacked_by(arg_framework.attacks, arg_mask) | arg_mask == arg_framework.all_mask
 
 
-def decide_complete_credulous(arg_framework: dict, arg_set: set) -> bool:
+def decide_complete_credulous(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
     Decide the Credulous acceptability of the given argument with respect to σ = complete.
     """
-    argument = list(arg_set)[0] # Recover the only provided argument.
-    complete_extensions = find_all_sigma_extensions(arg_framework, "COMPLETE")
-    return any(argument in complete_extension for complete_extension in complete_extensions)
+    return is_accepted(arg_framework, arg_mask, "COMPLETE", skeptical=False) # The mask of the only provided argument is its bit.
 
 
-def decide_complete_skeptical(arg_framework: dict, arg_set: set) -> bool:
+def decide_complete_skeptical(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
     Decide the Skeptical acceptability of the given argument with respect to σ = complete.
     """
-    argument = list(arg_set)[0] # Recover the only provided argument.
-    complete_extensions = find_all_sigma_extensions(arg_framework, "COMPLETE")
-    return all(argument in complete_extension for complete_extension in complete_extensions)
+    return is_accepted(arg_framework, arg_mask, "COMPLETE", skeptical=True) # The mask of the only provided argument is its bit.
 
 
-def decide_stable_credulous(arg_framework: dict, arg_set: set) -> bool:
+def decide_stable_credulous(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
     Decide the Credulous acceptability of the given argument with respect to σ = stable.
     """
-    argument = list(arg_set)[0] # Recover the only provided argument.
-    stable_ext = find_all_sigma_extensions(arg_framework, "STABLE")
-    return any(argument in stable for stable in stable_ext)
+    return is_accepted(arg_framework, arg_mask, "STABLE", skeptical=False) # The mask of the only provided argument is its bit.
 
 
-def decide_stable_skeptical(arg_framework: dict, arg_set: set) -> bool:
+def decide_stable_skeptical(arg_framework: AF_util.BitmaskAF, arg_mask: int) -> bool:
     """
     Decide the Skeptical acceptability of the given argument with respect to σ = stable.
     """
-    argument = list(arg_set)[0] # Recover the only provided argument.
-    stable_ext = find_all_sigma_extensions(arg_framework, "STABLE")
-    return all(argument in stable for stable in stable_ext)
-    
\ No newline at end of file
+    return is_accepted(arg_framework, arg_mask, "STABLE", skeptical=True) # The mask of the only provided argument is its bit.
@@ -10,6 +10,22 @@ Creation Date: 25/12/2023
 
 import os, sys, argparse, re, AF_util, AF_extensions
 
+# Regular expression for the lines of the .apx files, compiled once and run over the whole file at once (re.M anchors ^ and $ on each line).
+# Each argument is defined in a line of the form "arg(name_argument)." 
+# Each attack is defined in a line of the form "att(name_argument_1,name_argument_2)."
+# The named groups directly capture the argument, or the attacker and the attacked argument.
+APX_LINE_PATTERN = re.compile(r'^(?:arg\((?P<argument>\w+)\)|att\((?P<attacker>\w+),(?P<attacked>\w+)\))\.$', re.M)
+
+# Function solving each problem, looked up once by solve_problem() instead of comparing the problem with every name.
+PROBLEM_SOLVERS = {
+    "VE-CO": AF_extensions.verify_complete_extension,
+    "DC-CO": AF_extensions.decide_complete_credulous,
+    "DS-CO": AF_extensions.decide_complete_skeptical,
+    "VE-ST": AF_extensions.verify_stable_extension,
+    "DC-ST": AF_extensions.decide_stable_credulous,
+    "DS-ST": AF_extensions.decide_stable_skeptical,
+}
+
 def get_command_args() -> tuple:
     """ 
     Returns the arguments provided along the program execution.
@@ -25,18 +41,14 @@ def get_command_args() -> tuple:
     # Read args in the command.
     command_args = parser.parse_args()
 
-    # Regular expression for arguments. Can be any sequence of letters (upper case or lower case), numbers, 
-    # or the underscore symbol _, with the exception of the following sequences: "att" and "arg".
-    regex_pattern = re.compile(r"^(?!att$|arg$)\w+$")
-
     # Get command args.
     file_name = command_args.file # Recover the file containing the Argumentation Framework information to read (.apx).
     problem_name = command_args.problem # Recover the name of the problem (VE-CO, DC-CO, DS-CO...).
     
-    args_value = "" if command_args.arguments is None else set(command_args.arguments.split(","))
+    args_value = set() if command_args.arguments is None else set(command_args.arguments.split(","))
 
     # Checks for valid arguments. Raise a ValueError if at least one of them is not valid.
-    if not all(regex_pattern.match(argument) for argument in args_value):    
+    if not all(AF_util.is_argument_name_valid(argument) for argument in args_value):
         raise ValueError("Unaccepted argument(s). The name of an argument can be any sequence of letters " +
                          "(upper case or lower case), numbers, or the underscore symbol _, except the " +
                          "words 'arg' and 'att' which are reserved for defining the lines.")
@@ -48,64 +60,60 @@ def get_command_args() -> tuple:
     return problem_name, file_name, args_value
 
 
-def read_AF_from_file(file_path: str) -> dict:
+def read_AF_from_file(file_path: str) -> AF_util.BitmaskAF:
     """
-    Returns the argumentation framework (AF) read from the specified file as a dictionary.
-    Key : attacking argument, Value : set of the arguments it attacks.
+    Returns the argumentation framework (AF) read from the specified file, in its bitmask representation @see AF_util.build_bitmasks().
+    The names of the arguments are only used to read the file and the query, every problem is then solved on the ids and masks of the arguments.
     """
     if not os.path.exists(file_path):
         print(f"The file {file_path} does not exist.")
         sys.exit(1)
 
-    graph = {}
-    # Regular expression for arguments. 
-    # Each argument is defined in a line of the form "arg(name_argument)." 
-    # Each attack is defined in a line of the form "att(name_argument_1,name_argument_2)."
-    regex_pattern = re.compile(r'^(arg\(\w+\)|att\(\w+,\w+\))\.$')
-
+    # Read the whole file at once and scan it with a single regular expression, instead of matching it line by line.
     with open(file_path, 'r') as file:
-        for line in file:
-            # Checks for valid syntax for the representation of the AF in the text file. Raise a ValueError if at least one of them is not valid.
-            if not regex_pattern.match(line):
-                raise ValueError("Unaccepted argument or attack for the representation of the AF in the text file.\n"+ 
-                                "Each argument must be defined in a line of the form 'arg(name_argument).'\n"+
-                                "Each attack must be defined in a line of the form 'att(name_argument_1,name_argument_2).'.")
-            content = line[line.find("(")+1 : line.find(")")]
-            if line.startswith("arg"):
-                argument = content
-                graph[argument] = set()
-            elif line.startswith("att"):
-                attacker, attacked = content.split(',')[0], content.split(',')[1]
-                if not attacker in graph.keys():
-                    raise ValueError("One of the attacker is not part of the arguments. All arguments must be defined before attacks.")
-                graph[attacker].add(attacked)
-                
-    return graph
-
-
-def solve_problem(problem: str, arg_framework: dict, arg_set: set) -> bool:
+        content = file.read()
+    matches = list(APX_LINE_PATTERN.finditer(content))
+
+    # Checks for valid syntax for the representation of the AF in the text file. Raise a ValueError if at least one line is not valid,
+    # i.e. if there are less matches than lines (a match never spans several lines).
+    line_count = content.count("\n") + (content != "" and not content.endswith("\n"))
+    if len(matches) != line_count:
+        raise ValueError("Unaccepted argument or attack for the representation of the AF in the text file.\n"+ 
+                        "Each argument must be defined in a line of the form 'arg(name_argument).'\n"+
+                        "Each attack must be defined in a line of the form 'att(name_argument_1,name_argument_2).'.")
+
+    # The framework is first read as a dictionary. Key : attacking argument, Value : set of the arguments it attacks.
+    graph = {}
+    for match in matches:
+        if match['argument'] is not None:
+            graph[match['argument']] = set()
+        else:
+            attacker, attacked = match['attacker'], match['attacked']
+            if not attacker in graph.keys():
+                raise ValueError("One of the attacker is not part of the arguments. All arguments must be defined before attacks.")
+            graph[attacker].add(attacked)
+
+    # An attacked argument may be defined after its attacks, or never: an attack towards a name which is not an argument
+    # has no effect on the extensions, and is left out of the bitmask representation which only gives an id to the arguments.
+    graph = {attacker: attacked_args & graph.keys() for attacker, attacked_args in graph.items()}
+    return AF_util.build_bitmasks(graph)
+
+
+def solve_problem(problem: str, arg_framework: AF_util.BitmaskAF, arg_set: set) -> bool:
     """
     Returns either True (YES) or False (NO) depending on the problem for the result to be printed in main().
     """
     # Return False if at least one of the arguments in the provided set does not belong to the argumentation framework.
     if not AF_util.is_argument_set_in_AF(arg_framework, arg_set): return False
 
-    if problem == "VE-CO":
-        return  AF_extensions.verify_complete_extension(arg_framework, arg_set)
-    elif problem == "DC-CO":
-        return  AF_extensions.decide_complete_credulous(arg_framework, arg_set)
-    elif problem == "DS-CO":
-        return  AF_extensions.decide_complete_skeptical(arg_framework, arg_set)
-    elif problem == "VE-ST":
-        return  AF_extensions.verify_stable_extension(arg_framework, arg_set)
-    elif problem == "DC-ST":
-        return  AF_extensions.decide_stable_credulous(arg_framework, arg_set)
-    elif problem == "DS-ST":
-        return  AF_extensions.decide_stable_skeptical(arg_framework, arg_set)
-    else:
+    solver = PROBLEM_SOLVERS.get(problem)
+    if solver is None:
         raise ValueError("Unknown parameter.\n" +
                          "Please choose one of these : VE-CO or DC-CO or DS-CO or VE-ST or DC-ST or DS-ST.")
 
+    # The provided arguments are translated once into a mask, on which the problem is solved.
+    return solver(arg_framework, AF_util.arguments_to_mask(arg_framework, arg_set))
+
 
 def print_result(result: bool):
     """
@@ -7,7 +7,24 @@ Authors: Latif YAYA, Nassim LATTAB, Kentaro SAUCE
 Creation Date: 25/12/2023
 """
 
-from itertools import chain, combinations # Used to generate the powerset @see powerset(iterable).
+from dataclasses import dataclass, field
+
+@dataclass(frozen=True, slots=True)
+class BitmaskAF:
+    """
+    Bitmask representation of an argumentation framework, built once when the framework is read @see build_bitmasks().
+    Being immutable and hashable, it is used as the key of the memoized results computed on a framework.
+    """
+    arguments: tuple # Names of the arguments, by id.
+    positions: tuple # Position of each argument in the declaration order of the framework, by id.
+    attacks: tuple # Mask of the arguments attacked by each argument, by id.
+    attackers: tuple # Mask of the attackers of each argument, by id.
+    components: tuple # Ranges of ids (lo, hi) of the strongly connected components, in topological order.
+    all_mask: int # Mask of all the arguments of the framework.
+    index: dict = field(compare=False, hash=False) # Id of each argument, by name (derived from arguments, thus left out of the hash).
+
+# Words reserved for defining the lines of the .apx files, which cannot be used as argument names.
+RESERVED_WORDS = frozenset({"arg", "att"})
 
 def is_number_of_arguments_valid(arg_set: set, problem: str) -> bool:
     """ 
@@ -15,34 +32,212 @@ def is_number_of_arguments_valid(arg_set: set, problem: str) -> bool:
     Only one should be specified when using the Determine-XX problems.
     """
     if problem.startswith("DC") or problem.startswith("DS"):
-        return not len(arg_set) != 1
+        return len(arg_set) == 1
     return True
 
 
-def is_argument_set_in_AF(arg_framework: dict, arg_set: set) -> bool:
+def is_argument_name_valid(argument: str) -> bool:
+    """
+    Checks if the provided argument name is valid, or not. It can be any sequence of letters (upper case or lower case), numbers,
+    or the underscore symbol _, with the exception of the reserved words "att" and "arg".
+    """
+    # String methods implemented in C rather than a regular expression: once the underscores are replaced by a letter,
+    # the name must only contain letters and numbers (isalnum() is False for the empty string).
+    return argument not in RESERVED_WORDS and argument.replace("_", "a").isalnum()
+
+
+def is_argument_set_in_AF(arg_framework: BitmaskAF, arg_set: set) -> bool:
     """
     Checks if an argument or an argument set is included in the argumentation framework, or not.
     """
-    return all(argument in arg_framework.keys() for argument in arg_set)
-    
-    
-def is_defended(arg_framework: dict, arg_set: set, argument: str) -> bool:
-    """ 
-    Checks if the provided argument is defended by at least one other argument of the given set, or not. 
-    """
-    # Return True if at least one argument of the set defends the argument in case of an attack, and False otherwise.
-    for attacker in arg_framework:
-        attacked_args = arg_framework[attacker]
-        if argument in attacked_args:
-            if not any(attacker in arg_framework[defender] for defender in arg_set):
-                return False
-    return True
+    # Single subset test against the keys view of the index of the framework, instead of checking the arguments one by one.
+    return arg_set <= arg_framework.index.keys()
 
-def powerset(iterable: set|tuple|list) -> set:
-    """ 
-    Returns the powerset of the given arguments. In other words, give all possible combinations of arguments as a set of sorted tuples.
-    For instance, powerset([1,2,3]) --> () (1,) (2,) (3,) (1,2) (1,3) (2,3) (1,2,3).
-    Inspired by the powerset recipe provided in the following documentation: https://docs.python.org/3/library/itertools.html#itertools-recipes.
+
+def arguments_to_mask(arg_framework: BitmaskAF, arg_set: set) -> int:
+    """
+    Returns the mask of the given arguments of the framework.
+    """
+    arg_mask = 0
+    for argument in arg_set:
+        arg_mask |= 1 << arg_framework.index[argument]
+    return arg_mask
+
+
+def strongly_connected_components(arg_framework: dict) -> list:
+    """
+    Returns the strongly connected components of the attack graph as lists of arguments, in topological order:
+    the attackers of an argument all belong to its own component or to the previous ones.
+    They are computed in O(n + m) with an iterative version of Tarjan's algorithm.
+    """
+    index, lowlink, on_stack = {}, {}, set()
+    stack, components = [], []
+    for root in arg_framework:
+        if root in index: continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root); on_stack.add(root)
+        # Explicit stack of the arguments being visited, along with the iterator over the arguments they attack.
+        visiting = [(root, iter(arg_framework[root]))]
+        while visiting:
+            argument, attacked_args = visiting[-1]
+            for attacked_arg in attacked_args:
+                if attacked_arg not in index:
+                    index[attacked_arg] = lowlink[attacked_arg] = len(index)
+                    stack.append(attacked_arg); on_stack.add(attacked_arg)
+                    visiting.append((attacked_arg, iter(arg_framework[attacked_arg])))
+                    break
+                if attacked_arg in on_stack:
+                    lowlink[argument] = min(lowlink[argument], index[attacked_arg])
+            else:
+                # Every argument attacked by this one has been visited.
+                visiting.pop()
+                if visiting:
+                    parent = visiting[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[argument])
+                if lowlink[argument] == index[argument]:
+                    component = []
+                    while not component or component[-1] != argument:
+                        component.append(stack.pop())
+                        on_stack.discard(component[-1])
+                    components.append(component)
+
+    # Tarjan's algorithm finds a component after all the components it attacks.
+    components.reverse()
+    return components
+
+
+def build_bitmasks(arg_framework: dict) -> BitmaskAF:
+    """
+    Returns the bitmask representation of the argumentation framework @see BitmaskAF.
+    The argument arguments[i] is identified by its id i and represented by the bit 1 << i,
+    so that a set of arguments becomes a single integer mask.
+    attacks[i] is the mask of the arguments attacked by arguments[i], and attackers[i] is the mask of its attackers.
+    positions[i] is the position of arguments[i] in the framework, used to give back the arguments in their declaration order.
+    The arguments are ordered by strongly connected component @see strongly_connected_components(), so that each component
+    is the range of ids [lo, hi) of a tuple (lo, hi) of components, and an argument is only attacked by arguments of lower or equal component.
+    """
+    scc_list = strongly_connected_components(arg_framework)
+    arguments = tuple(argument for component in scc_list for argument in component)
+    index = {argument: i for i, argument in enumerate(arguments)}
+    declaration_order = {argument: position for position, argument in enumerate(arg_framework)}
+    positions = tuple(declaration_order[argument] for argument in arguments)
+    attacks, attackers = [0] * len(arguments), [0] * len(arguments)
+    for i, argument in enumerate(arguments):
+        for attacked_arg in arg_framework[argument]:
+            j = index[attacked_arg]
+            attacks[i] |= 1 << j
+            attackers[j] |= 1 << i
+
+    components, lo = [], 0
+    for component in scc_list:
+        components.append((lo, lo + len(component)))
+        lo += len(component)
+    return BitmaskAF(arguments, positions, tuple(attacks), tuple(attackers), tuple(components), (1 << len(arguments)) - 1, index)
+
+
+def iter_bits(mask: int):
+    """
+    Yields the position of every bit set in the given mask, from the lowest to the highest.
+    For instance, iter_bits(0b1010) --> 1 3.
+    """
+    while mask:
+        lowest_bit = mask & -mask
+        yield lowest_bit.bit_length() - 1
+        mask ^= lowest_bit
+
+
+def enumerate_conflict_free(attacks: tuple, attackers: tuple, n: int, seed_mask: int = 0, start: int = 0, covering: bool = False, excluded_mask: int = 0):
+    """
+    Yields every conflict-free set of the framework as a tuple (mask of the set, mask of the arguments it attacks),
+    without visiting the other subsets. The sets are built by a depth-first search which only extends the current set
+    with arguments of higher id that neither attack it nor are attacked by it.
+    The mask of the attacked arguments is updated along with the set (one OR per added argument),
+    so that the callers don't have to compute it again for every set @see attacked_by().
+    Only arguments of id in [start, n) are added to the (conflict-free) seed mask, which allows
+    the search to be split into independent parts @see AF_extensions.search_extensions().
+    If covering is True, the search skips the sets which cannot be extended to attack every argument of id lower than n outside of them,
+    i.e. it only yields the candidates for stable extensions.
+    The arguments of excluded_mask are never added to the sets.
+    """
+    # Self-attacking arguments can never be part of a conflict-free set, nor the arguments attacking or attacked by the seed.
+    forbidden_mask = seed_mask | excluded_mask
+    for i in range(start, n):
+        if attacks[i] >> i & 1:
+            forbidden_mask |= 1 << i
+    for i in iter_bits(seed_mask):
+        forbidden_mask |= attacks[i] | attackers[i]
+
+    bounds_mask = (1 << n) - 1
+
+    def can_cover(arg_mask: int, forbidden_mask: int, attacked_mask: int, start: int) -> bool:
+        # An argument which is neither in the set nor attacked by it, and which cannot be added anymore,
+        # must be attacked by one of the arguments which can still be added to the set.
+        addable_mask = bounds_mask & ~forbidden_mask & ~((1 << start) - 1)
+        uncovered_mask = bounds_mask & ~arg_mask & ~attacked_mask & ~addable_mask
+        return all(attackers[j] & addable_mask for j in iter_bits(uncovered_mask))
+
+    # The depth-first search uses an explicit stack of the sets left to visit, rather than recursive generators
+    # through which every set would be passed up once per level of depth.
+    stack = [(seed_mask, forbidden_mask, attacked_by(attacks, seed_mask), start)]
+    while stack:
+        arg_mask, forbidden_mask, attacked_mask, start = stack.pop()
+        if covering and not can_cover(arg_mask, forbidden_mask, attacked_mask, start): continue
+        yield arg_mask, attacked_mask
+        for k in iter_bits(bounds_mask & ~forbidden_mask & ~((1 << start) - 1)):
+            stack.append((arg_mask | 1 << k, forbidden_mask | attacks[k] | attackers[k], attacked_mask | attacks[k], k + 1))
+
+
+def mask_to_arguments(arg_framework: BitmaskAF, mask: int) -> tuple:
+    """
+    Returns the names of the arguments of the given mask as a tuple, in the order in which they are declared in the framework.
+    """
+    # The ids follow the strongly connected components of the framework, the arguments are put back in their declaration order.
+    return tuple(arg_framework.arguments[i] for i in sorted(iter_bits(mask), key=arg_framework.positions.__getitem__))
+
+
+def attacked_by(attacks: tuple, arg_mask: int) -> int:
+    """
+    Returns the mask of all arguments attacked by at least one argument of the given mask.
+    """
+    # Walk through the set bits of the mask directly rather than through iter_bits(), as this is called for every candidate set.
+    attacked = 0
+    while arg_mask:
+        lowest_bit = arg_mask & -arg_mask
+        attacked |= attacks[lowest_bit.bit_length() - 1]
+        arg_mask ^= lowest_bit
+    return attacked
+
+
+def defended_by(attackers: tuple, attacked_mask: int) -> int:
+    """
+    Returns the mask of all arguments defended by a set attacking the given mask of arguments,
+    i.e. the arguments whose attackers are all part of the attacked mask.
+    """
+    defended, bit = 0, 1
+    for attackers_mask in attackers:
+        if not attackers_mask & ~attacked_mask:
+            defended |= bit
+        bit <<= 1
+    return defended
+
+
+def grounded_extension(attacks: tuple, attackers: tuple) -> int:
+    """
+    Returns the mask of the grounded extension of the framework given by its bitmask representation,
+    i.e. the least fixed point of the characteristic function F(S) = {arguments defended by S}.
+    It is computed in O(n + m) with a worklist: an argument is accepted once all its attackers are rejected,
+    and an argument is rejected as soon as one of its attackers is accepted.
     """
-    s = list(iterable) 
-    return set(chain.from_iterable(combinations(s, r) for r in range(len(s) + 1)))
\ No newline at end of file
+    grounded_mask, rejected_mask = 0, 0
+    # Number of attackers of each argument which are not rejected yet.
+    remaining_attackers = [attackers_mask.bit_count() for attackers_mask in attackers]
+    accepted = [i for i, count in enumerate(remaining_attackers) if count == 0]
+    while accepted:
+        i = accepted.pop()
+        grounded_mask |= 1 << i
+        for j in iter_bits(attacks[i] & ~rejected_mask):
+            rejected_mask |= 1 << j
+            for k in iter_bits(attacks[j]):
+                remaining_attackers[k] -= 1
+                if remaining_attackers[k] == 0: accepted.append(k)
+    return grounded_mask